@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import csv, os, re, html, json
+import csv, io, os, re, sys, html, json, hashlib, functools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
@@ -22,7 +23,22 @@ ASSETS_JS  = "assets/chat.js"
 
 # ---------- helpers ----------
 
+_RE_PARA_SPLIT = re.compile(r"\n{2,}|\r?\n")
+_RE_H1 = re.compile(r"<h1[^>]*>(.*?)</h1>", re.S | re.I)
+_RE_TAGS = re.compile(r"<.*?>")
+_RE_DATE_MODIFIED = re.compile(rb'"dateModified": "[^"]*"')
+
+def esc(s: str) -> str:
+    """html.escape(quote=True) с быстрым выходом: в большинстве полей спецсимволов нет."""
+    if "&" in s or "<" in s or ">" in s or '"' in s or "'" in s:
+        return html.escape(s)
+    return s
+
+@functools.lru_cache(maxsize=4096)
 def norm_url(u: str) -> str:
+    # частый случай: уже "/chat/slug/" — ничего не делаем
+    if u and u[0] == "/" and u[-1] == "/":
+        return u
     u = (u or "").strip()
     if not u:
         return ""
@@ -32,6 +48,7 @@ def norm_url(u: str) -> str:
         u = u + "/"
     return u
 
+@functools.lru_cache(maxsize=4096)
 def slug_from_url(u: str) -> str:
     u = norm_url(u)
     return u.strip("/").split("/")[-1]
@@ -44,8 +61,7 @@ def para(text: str) -> str:
     t = (text or "").strip()
     if not t:
         return ""
-    parts = [f"<p>{html.escape(p.strip())}</p>" for p in re.split(r"\n{2,}|\r?\n", t) if p.strip()]
-    return "\n".join(parts)
+    return "\n".join(f"<p>{esc(p)}</p>" for p in map(str.strip, _RE_PARA_SPLIT.split(t)) if p)
 
 def parse_internal_links(s: str) -> list[dict]:
     """
@@ -76,9 +92,41 @@ def out_path_for(url: str, slug: str) -> Path:
         raise ValueError("empty slug/url")
     return OUT_DIR / s / "index.html"
 
+def write_file(path: Path, parts: list[bytes]) -> None:
+    """Пишет готовые байты напрямую через os.open/os.write(v), минуя TextIOWrapper."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        if hasattr(os, "writev"):
+            # вся страница — одним системным вызовом, без склейки кусков
+            done = os.writev(fd, parts)
+            if done == sum(map(len, parts)):
+                return
+            parts = [b"".join(parts)[done:]]  # частичная запись — дописываем остаток
+        for part in parts:
+            view = memoryview(part)
+            while view:
+                view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def page_digest(parts: list[bytes]) -> str:
+    """Хэш страницы без dateModified — меняется только при реальной правке."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(_RE_DATE_MODIFIED.sub(b'"dateModified": ""', part))
+    return h.hexdigest()
+
+def file_digest(path: Path) -> str | None:
+    """page_digest того, что реально лежит на диске (правки руками, checkout, merge)."""
+    try:
+        return page_digest([path.read_bytes()])
+    except OSError:
+        return None
+
 def now_iso() -> str:
     return datetime.now(TZ).isoformat(timespec="seconds")
 
+@functools.lru_cache(maxsize=4096)
 def pretty_from_slug(u: str) -> str:
     s = slug_from_url(u)
     s = s.replace("-", " ")
@@ -89,59 +137,54 @@ def pretty_from_slug(u: str) -> str:
 
 def render_badges(items: list[str]) -> str:
     if not items: return ""
-    return '<div class="pill-row">' + "".join(f'<span class="pill">{html.escape(x)}</span>' for x in items) + "</div>"
+    return '<div class="pill-row"><span class="pill">' + '</span><span class="pill">'.join(map(esc, items)) + "</span></div>"
 
 def render_list(items: list[str]) -> str:
     if not items: return ""
-    li = "".join(f"<li>{html.escape(x)}</li>" for x in items)
-    return f"<ul class='ul'>{li}</ul>"
+    return "<ul class='ul'><li>" + "</li><li>".join(map(esc, items)) + "</li></ul>"
 
 def render_chips(items: list[str]) -> str:
     if not items: return ""
-    return '<div class="chips">' + "".join(f'<span class="chip">{html.escape(x)}</span>' for x in items) + "</div>"
+    return '<div class="chips"><span class="chip">' + '</span><span class="chip">'.join(map(esc, items)) + "</span></div>"
 
 def render_related(links: list[dict]) -> str:
     if not links: return ""
-    s = "".join(f'<a class="chip link glow" href="{html.escape(l["href"])}">{html.escape(l["text"])}</a>' for l in links)
+    s = "".join(f'<a class="chip link glow" href="{esc(l["href"])}">{esc(l["text"])}</a>' for l in links)
     return f'<div class="related">{s}</div>'
 
 def render_scenarios(rows: list[tuple[str, str]]) -> str:
     rows = [(t, d) for (t, d) in rows if (t or d)]
     if not rows: return ""
-    cards = []
-    for t, d in rows:
-        cards.append(
-            f"""<div class="card glow">
-  <div class="card-title">{html.escape(t or "Сценарий")}</div>
+    return '<div class="grid-3">' + "".join(
+        f"""<div class="card glow">
+  <div class="card-title">{esc(t or "Сценарий")}</div>
   <div class="card-text">{para(d)}</div>
 </div>"""
-        )
-    return '<div class="grid-3">' + "".join(cards) + "</div>"
+        for t, d in rows
+    ) + "</div>"
 
 def render_faq(qas: list[tuple[str, str]]) -> str:
     qas = [(q, a) for (q, a) in qas if (q or a)]
     if not qas: return ""
-    blocks = []
-    for q, a in qas:
-        blocks.append(
-            f"""<details class="faq">
-  <summary>{html.escape(q or "Вопрос")}</summary>
+    return "<section class='faq-wrap'>" + "".join(
+        f"""<details class="faq">
+  <summary>{esc(q or "Вопрос")}</summary>
   <div class="faq-a">{para(a)}</div>
 </details>"""
-        )
-    return "<section class='faq-wrap'>" + "".join(blocks) + "</section>"
-
-def json_ld(site_base: str, url_path: str, meta_title: str, meta_desc: str) -> str:
-    data = {
-        "@context": "https://schema.org",
-        "@type": "WebPage",
-        "url": f"{site_base}{url_path}",
-        "name": meta_title,
-        "description": meta_desc,
-        "inLanguage": "ru",
-        "dateModified": now_iso(),
-    }
-    return '<script type="application/ld+json">' + json.dumps(data, ensure_ascii=False) + "</script>"
+        for q, a in qas
+    ) + "</section>"
+
+def _js(s: str) -> str:
+    return json.dumps(s, ensure_ascii=False)
+
+def json_ld(site_base: str, url_path: str, meta_title: str, meta_desc: str, date_modified: str) -> str:
+    # схема фиксирована — json.dumps только для строковых значений, без обхода dict
+    return ('<script type="application/ld+json">'
+            '{"@context": "https://schema.org", "@type": "WebPage", '
+            f'"url": {_js(site_base + url_path)}, "name": {_js(meta_title)}, '
+            f'"description": {_js(meta_desc)}, "inLanguage": "ru", '
+            f'"dateModified": {_js(date_modified)}}}'
+            "</script>")
 
 # ---------- title index for anchors ----------
 
@@ -166,18 +209,19 @@ def build_title_index(rows: list[dict]) -> dict:
                 txt = p.read_text(encoding="utf-8", errors="ignore")
             except Exception:
                 continue
-            m = re.search(r"<h1[^>]*>(.*?)</h1>", txt, flags=re.S|re.I)
+            m = _RE_H1.search(txt)
             if m:
-                h1 = re.sub(r"<.*?>", "", m.group(1)).strip()
+                h1 = _RE_TAGS.sub("", m.group(1)).strip()
                 if h1:
                     idx[url_path] = h1
     return idx
 
 def enrich_related(links: list[dict], title_index: dict) -> list[dict]:
+    # href уже нормализован в parse_internal_links — повторно norm_url не зовём
     out = []
     for l in links:
-        href = norm_url(l.get("href",""))
-        text = (l.get("text") or "").strip()
+        href = l["href"]
+        text = l["text"]
         if not text:
             text = title_index.get(href) or pretty_from_slug(href)
         out.append({"href": href, "text": text})
@@ -185,7 +229,45 @@ def enrich_related(links: list[dict], title_index: dict) -> list[dict]:
 
 # ---------- render full page ----------
 
-def render_page(row: dict, title_index: dict) -> str:
+# неизменные куски страницы — собираются один раз, а не на каждой строке CSV
+TELEGRAM_URL_ESC = esc(TELEGRAM_URL)
+
+PAGE_PREFIX = """<!doctype html>
+<html lang="ru">
+<head>
+<meta charset="utf-8" />
+<meta name="viewport" content="width=device-width,initial-scale=1" />
+"""
+
+PAGE_ASSETS = f"""<link rel="stylesheet" href="/{ASSETS_CSS}">
+<script defer src="/{ASSETS_JS}"></script>
+"""
+
+PAGE_TOP = f"""
+</head>
+<body class="theme-dark">
+<header class="site-top">
+  <div class="container">
+    <a class="brand" href="/">Luna Chat</a>
+    <a class="btn primary sticky-cta" href="{TELEGRAM_URL_ESC}">Открыть чат в Telegram</a>
+  </div>
+</header>
+
+<main class="container">
+"""
+
+PAGE_FOOT = """
+</main>
+
+<footer class="site-foot">
+  <div class="container">
+    <small>© 2025 Luna Chat • Уважайте границы, 18+</small>
+  </div>
+</footer>
+</body></html>
+"""
+
+def render_page(row: dict, title_index: dict, build_iso: str) -> tuple[str, ...]:
     url           = norm_url(row.get("url",""))
     title         = row.get("title","").strip()
     meta_title    = (row.get("meta_title") or title).strip() or title
@@ -222,37 +304,22 @@ def render_page(row: dict, title_index: dict) -> str:
     related       = enrich_related(parse_internal_links(row.get("internal_links","")), title_index)
     canonical     = (row.get("canonical","").strip() or f"{SITE_BASE}{url}")
 
-    head = f"""<!doctype html>
-<html lang="ru">
-<head>
-<meta charset="utf-8" />
-<meta name="viewport" content="width=device-width,initial-scale=1" />
-<title>{html.escape(meta_title)}</title>
-<meta name="description" content="{html.escape(meta_desc)}" />
-<link rel="canonical" href="{html.escape(canonical)}" />
+    e_title, e_desc, e_canonical = esc(meta_title), esc(meta_desc), esc(canonical)
+    meta = f"""<title>{e_title}</title>
+<meta name="description" content="{e_desc}" />
+<link rel="canonical" href="{e_canonical}" />
 <meta property="og:type" content="article" />
-<meta property="og:title" content="{html.escape(meta_title)}" />
-<meta property="og:description" content="{html.escape(meta_desc)}" />
-<meta property="og:url" content="{html.escape(canonical)}" />
-<link rel="stylesheet" href="/{ASSETS_CSS}">
-<script defer src="/{ASSETS_JS}"></script>
-{json_ld(SITE_BASE, url, meta_title, meta_desc)}
-</head>
-<body class="theme-dark">
-<header class="site-top">
-  <div class="container">
-    <a class="brand" href="/">Luna Chat</a>
-    <a class="btn primary sticky-cta" href="{html.escape(TELEGRAM_URL)}">Открыть чат в Telegram</a>
-  </div>
-</header>
+<meta property="og:title" content="{e_title}" />
+<meta property="og:description" content="{e_desc}" />
+<meta property="og:url" content="{e_canonical}" />
+"""
 
-<main class="container">
-  <section class="hero">
-    <h1>{html.escape(h1)}</h1>
-    <p class="lead">{html.escape(intro)}</p>
+    hero = f"""  <section class="hero">
+    <h1>{esc(h1)}</h1>
+    <p class="lead">{esc(intro)}</p>
     {render_badges(bullets[:4] or tags[:4])}
     <div class="hero-cta">
-      <a class="btn primary" href="{html.escape(TELEGRAM_URL)}">{html.escape(cta_text)}</a>
+      <a class="btn primary" href="{TELEGRAM_URL_ESC}">{esc(cta_text)}</a>
     </div>
   </section>
 """
@@ -277,7 +344,7 @@ def render_page(row: dict, title_index: dict) -> str:
 
     def h2_block(title, text):
         if not (title or text): return ""
-        return f"<section><h2>{html.escape(title)}</h2>{para(text)}</section>"
+        return f"<section><h2>{esc(title)}</h2>{para(text)}</section>"
 
     body.append(h2_block(h2a_title, h2a_text))
     body.append(h2_block(h2b_title, h2b_text))
@@ -287,8 +354,6 @@ def render_page(row: dict, title_index: dict) -> str:
     if any(t for (t, _) in scenarios):
         body.append("<section><h2>Сценарии</h2>" + render_scenarios(scenarios) + "</section>")
 
-    tips_do = split_list(row.get("tips_do",""))
-    tips_avoid = split_list(row.get("tips_avoid",""))
     if tips_do or tips_avoid:
         tips = "<section class='two-col'>"
         if tips_do:
@@ -303,17 +368,8 @@ def render_page(row: dict, title_index: dict) -> str:
     if related:
         body.append("<section><h2>Ещё по теме</h2>" + render_related(related) + "</section>")
 
-    foot = """
-</main>
-
-<footer class="site-foot">
-  <div class="container">
-    <small>© 2025 Luna Chat • Уважайте границы, 18+</small>
-  </div>
-</footer>
-</body></html>
-"""
-    return head + "\n".join([b for b in body if b]) + foot
+    return (PAGE_PREFIX, meta, PAGE_ASSETS, json_ld(SITE_BASE, url, meta_title, meta_desc, build_iso),
+            PAGE_TOP, hero, "\n".join([b for b in body if b]), PAGE_FOOT)
 
 # ---------- main ----------
 
@@ -382,24 +438,62 @@ def main():
     print(f"[i] CSV: {CSV_PATH}")
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    with CSV_PATH.open("r", encoding="utf-8-sig", newline="") as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    text = CSV_PATH.read_bytes().decode("utf-8-sig")
+    reader = csv.reader(io.StringIO(text, newline=""))
+    header = next(reader, [])
+    # dict(zip(...)) собирается в C — без построчной логики DictReader
+    rows = [dict(zip(header, r)) for r in reader if r]
     if not rows:
         raise SystemExit("[ERR] CSV has no rows")
 
     title_index = build_title_index(rows)
+    build_iso = now_iso()  # одно время сборки на все страницы
 
+    jobs = []
     for r in rows:
         try:
             out_path = out_path_for(r.get("url",""), r.get("slug",""))
         except Exception as e:
             print(f"[skip] row without slug/url: {e}")
             continue
-        html_page = render_page(r, title_index)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(html_page, encoding="utf-8")
-        print("[ok]", out_path.relative_to(ROOT))
+        jobs.append((r, out_path))
+
+    # одинаковый slug/url у нескольких строк: как и раньше, побеждает последняя строка.
+    # Иначе потоки пула писали бы в один файл одновременно.
+    by_path = {}
+    for r, out_path in jobs:
+        if out_path in by_path:
+            print(f"[dup] {out_path.relative_to(ROOT)}: строка перекрыта более поздней")
+        by_path[out_path] = (r, out_path)
+    jobs = list(by_path.values())
+
+    # все каталоги страниц — одним проходом, а не mkdir на каждой записи
+    for d in {p.parent for _, p in jobs}:
+        d.mkdir(parents=True, exist_ok=True)
+
+    # рендер — в основном потоке, запись на диск — в пуле (os.write отпускает GIL)
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 4) * 4)) as pool:
+        pending = []
+        for r, out_path in jobs:
+            data = [p.encode("utf-8") for p in render_page(r, title_index, build_iso)]
+            key = out_path.relative_to(OUT_DIR).as_posix()
+            # неизменённую страницу не перезаписываем: сверяем с тем, что лежит на диске
+            if file_digest(out_path) == page_digest(data):
+                pending.append((key, None))
+            else:
+                pending.append((key, pool.submit(write_file, out_path, data)))
+
+        # лог копим и выводим пачками, а не print() на каждую страницу
+        log = []
+        for key, fut in pending:
+            if fut is not None:
+                fut.result()
+            log.append(f"{'[=]' if fut is None else '[ok]'} {OUT_DIR.name}/{key}")
+            if len(log) >= 256:
+                sys.stdout.write("\n".join(log) + "\n")
+                log.clear()
+        if log:
+            sys.stdout.write("\n".join(log) + "\n")
 
     assets_dir = ROOT / "assets"
     assets_dir.mkdir(exist_ok=True)
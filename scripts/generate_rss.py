@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import os, csv, html, email.utils
+import os, io, csv, html
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
 
 SITE_BASE = os.environ.get("SITE_BASE", "https://gorod-legends.ru").rstrip("/")
 SITE_TITLE = os.environ.get("SITE_TITLE", "Luna Chat")
@@ -12,7 +13,18 @@ LANGUAGE = "ru"
 CSV_PATH = Path("pages.csv") if Path("pages.csv").exists() else Path("data/pages.csv")
 OUT_PATH = Path("rss.xml")  # <-- В КОРНЕ
 
+_WD = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MO = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+       "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+def rfc822(dt: datetime) -> str:
+    """RFC-822 дата для UTC (как email.utils.format_datetime, но без лишних веток)."""
+    return (f"{_WD[dt.weekday()]}, {dt.day:02d} {_MO[dt.month - 1]} {dt.year:04d} "
+            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d} +0000")
+
 def norm_url(u: str) -> str:
+    if u and u[0] == "/" and u[-1] == "/":
+        return u
     u = (u or "").strip()
     if not u.startswith("/"): u = "/" + u
     if not u.endswith("/"):  u = u + "/"
@@ -22,45 +34,52 @@ def main():
     if not CSV_PATH.exists():
         raise SystemExit(f"[ERR] CSV not found: {CSV_PATH}")
 
-    with open(CSV_PATH, newline="", encoding="utf-8-sig") as f:
-        rows = list(csv.DictReader(f))
+    text = CSV_PATH.read_bytes().decode("utf-8-sig")
+    reader = csv.reader(io.StringIO(text, newline=""))
+    header = next(reader, [])
+    rows = [r for r in reader if r]  # пустые строки пропускаем, как DictReader
+    col = {name: i for i, name in enumerate(header)}
+    i_url, i_title, i_desc, i_intro = (col.get(k, -1) for k in ("url", "title", "description", "intro"))
+
+    def cell(r: list[str], i: int) -> str:
+        return r[i] if 0 <= i < len(r) else ""
 
-    rows_rev = list(reversed(rows))
     now = datetime.now(timezone.utc)
-    last_build = email.utils.format_datetime(now)
+    last_build = rfc822(now)
 
-    out = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<rss version="2.0">',
-        '  <channel>',
-        f'    <title>{html.escape(SITE_TITLE)}</title>',
-        f'    <link>{SITE_BASE}</link>',
-        f'    <description>{html.escape(SITE_DESCRIPTION)}</description>',
-        f'    <language>{LANGUAGE}</language>',
-        f'    <lastBuildDate>{last_build}</lastBuildDate>',
-        f'    <pubDate>{last_build}</pubDate>',
-    ]
+    with open(OUT_PATH, "w", encoding="utf-8", buffering=1 << 20) as fh:
+        fh.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0">\n'
+            '  <channel>\n'
+            f'    <title>{html.escape(SITE_TITLE)}</title>\n'
+            f'    <link>{xml_escape(SITE_BASE)}</link>\n'
+            f'    <description>{html.escape(SITE_DESCRIPTION)}</description>\n'
+            f'    <language>{LANGUAGE}</language>\n'
+            f'    <lastBuildDate>{last_build}</lastBuildDate>\n'
+            f'    <pubDate>{last_build}</pubDate>\n'
+        )
 
-    for i, r in enumerate(rows_rev):
-        u = (r.get("url") or "").strip()
-        if not u: continue
-        link = f"{SITE_BASE}{norm_url(u)}"
-        title = (r.get("title") or u.strip("/")).strip()
-        desc  = (r.get("description") or r.get("intro") or "").strip()
-        pub   = email.utils.format_datetime(now - timedelta(minutes=i))
-        out += [
-            "    <item>",
-            f"      <title>{html.escape(title)}</title>",
-            f"      <link>{link}</link>",
-            f"      <description>{html.escape(desc)}</description>",
-            f"      <pubDate>{pub}</pubDate>",
-            f"      <guid isPermaLink=\"true\">{link}</guid>",
-            "    </item>"
-        ]
+        # reversed() — ленивый итератор, копию списка не создаём
+        for i, r in enumerate(reversed(rows)):
+            u = cell(r, i_url).strip()
+            if not u: continue
+            link = xml_escape(f"{SITE_BASE}{norm_url(u)}")
+            title = (cell(r, i_title) or u.strip("/")).strip()
+            desc  = (cell(r, i_desc) or cell(r, i_intro)).strip()
+            pub   = rfc822(now - timedelta(minutes=i))
+            fh.write(
+                "    <item>\n"
+                f"      <title>{html.escape(title)}</title>\n"
+                f"      <link>{link}</link>\n"
+                f"      <description>{html.escape(desc)}</description>\n"
+                f"      <pubDate>{pub}</pubDate>\n"
+                f"      <guid isPermaLink=\"true\">{link}</guid>\n"
+                "    </item>\n"
+            )
 
-    out += ["  </channel>", "</rss>"]
-    OUT_PATH.write_text("\n".join(out), encoding="utf-8")
-    print(f"[DONE] {OUT_PATH} ({len(rows_rev)} items)")
+        fh.write("  </channel>\n</rss>")
+    print(f"[DONE] {OUT_PATH} ({len(rows)} items)")
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,7 @@
 import os, subprocess, datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
+from xml.sax.saxutils import escape as xml_escape
 
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория (ai/)
 SITE_BASE = os.environ.get("SITE_BASE", "https://gorod-legends.ru").rstrip("/")
@@ -23,6 +24,8 @@ EXCLUDE_FILES = {"404.html"}
 
 MSK = ZoneInfo("Europe/Moscow")
 
+URL_TMPL = "  <url>\n    <loc>%s</loc>\n    <lastmod>%s</lastmod>\n  </url>\n"
+
 def is_excluded(rel: Path) -> bool:
     """Путь (относительно ROOT) попадает в исключённые папки?"""
     return any(part in EXCLUDE_DIRS for part in rel.parts)
@@ -73,23 +76,27 @@ def urls_from_files() -> dict[str, datetime.datetime]:
 
 def urls_from_csv() -> dict[str, datetime.datetime]:
     """Опционально: добавить URL из CSV (если нужно). lastmod = сейчас (MSK)."""
-    import csv
+    import csv, io
     items: dict[str, datetime.datetime] = {}
     csv_path = next((p for p in CSV_CANDIDATES if p.exists()), None)
     if not csv_path:
         return items
     now_msk = datetime.datetime.now(tz=MSK)
-    with csv_path.open(newline="", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            u = (row.get("url") or "").strip()
-            if not u:
-                continue
-            if not u.startswith("/"):
-                u = "/" + u
-            if not u.endswith("/") and u.endswith(".html") is False:
-                u += "/"
-            items.setdefault(u, now_msk)
+    text = csv_path.read_bytes().decode("utf-8-sig")
+    reader = csv.reader(io.StringIO(text, newline=""))
+    header = next(reader, [])
+    if "url" not in header:
+        return items
+    i_url = header.index("url")
+    for row in reader:
+        u = (row[i_url] if i_url < len(row) else "").strip()
+        if not u:
+            continue
+        if not u.startswith("/"):
+            u = "/" + u
+        if not u.endswith("/") and u.endswith(".html") is False:
+            u += "/"
+        items.setdefault(u, now_msk)
     return items
 
 def main():
@@ -100,22 +107,15 @@ def main():
     if INCLUDE_CSV:
         items.update(urls_from_csv())
 
-    # 3) Пишем sitemap.xml
-    lines = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
-    ]
-    for u in sorted(items):
-        lastmod = items[u].isoformat(timespec="seconds")
-        lines += [
-            "  <url>",
-            f"    <loc>{SITE_BASE}{u}</loc>",
-            f"    <lastmod>{lastmod}</lastmod>",
-            "  </url>"
-        ]
-    lines.append("</urlset>")
-
-    OUT_PATH.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    # 3) Пишем sitemap.xml — сразу в файл, без промежуточного списка строк
+    with open(OUT_PATH, "w", encoding="utf-8", buffering=1 << 20) as fh:
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        fh.writelines(
+            URL_TMPL % (xml_escape(SITE_BASE + u), items[u].isoformat(timespec="seconds"))
+            for u in sorted(items)
+        )
+        fh.write("</urlset>\n")
     print(f"[OK] sitemap.xml: {len(items)} urls -> {OUT_PATH}")
 
 if __name__ == "__main__":